@@ -8,6 +8,11 @@ captured before sending them for recognition.
 
 It supports multiple clients sending at the same time.
 
+If they are installed, the server uses uvloop as the event loop and orjson
+to serialize results. Both are optional:
+
+    pip install uvloop orjson
+
 HINT: This file supports all streaming models from icefall, which means
 you don't need ./conv_emformer_transducer_stateless2 or
 ./streaming_pruned_transducer_statelessX.
@@ -84,22 +89,34 @@ python3 ./sherpa/bin/streaming_client.py \
 
 import argparse
 import asyncio
+import collections
 import http
 import json
 import logging
 import math
+import multiprocessing
+import os
 import socket
 import ssl
 import sys
-import warnings
+import tempfile
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 
 import numpy as np
 import torch
 import websockets
 
+try:
+    # Optional. It is much faster than the json module from the
+    # standard library.
+    import orjson
+except ImportError:
+    orjson = None
+
 import sherpa
 from sherpa import (
     HttpServer,
@@ -112,6 +129,9 @@ from sherpa import (
     str2bool,
 )
 
+# Note: torch.inference_mode() is available only in torch >= 1.9
+inference_mode = getattr(torch, "inference_mode", torch.no_grad)
+
 
 def add_model_args(parser: argparse.ArgumentParser):
     parser.add_argument(
@@ -320,7 +340,20 @@ def get_args():
         help="""Max time in millisecond to wait to build batches for inference.
         If there are not enough requests in the stream queue to build a batch
         of max_batch_size, it waits up to this time before fetching available
-        requests for computation.
+        requests for computation. The actual wait time is adapted to the load.
+        See --target-batch-fullness.
+        """,
+    )
+
+    parser.add_argument(
+        "--target-batch-fullness",
+        type=float,
+        default=1.0,
+        help="""A value in (0, 1]. The server tracks a moving average of
+        batch_size/max_batch_size of recent batches and waits
+        max_wait_ms * (1 - average/target_batch_fullness) to build a batch.
+        That is, it waits up to max_wait_ms when the load is low and does not
+        wait once the recent batches are filled to this fraction.
         """,
     )
 
@@ -351,10 +384,31 @@ def get_args():
     )
 
     parser.add_argument(
-        "--num-threads",
+        "--num-workers",
         type=int,
         default=1,
-        help="Sets the number of threads used for interop parallelism (e.g. in JIT interpreter) on CPU.",
+        help="""Number of server processes. If it is larger than 1, each
+        process loads its own recognizer and all of them listen on --port
+        with SO_REUSEPORT, so that the kernel distributes new connections
+        among them. Processes are spread over the NUMA nodes and each one
+        is bound to an even share of the CPUs of its node.
+        Note: --max-active-connections applies to each process.
+        It is supported only on Linux.
+        """,
+    )
+
+    parser.add_argument(
+        "--num-threads",
+        type=int,
+        default=None,
+        help="""Sets the number of threads used for intra-op and interop
+        parallelism (e.g. in JIT interpreter) on CPU. Note: Each of the
+        --nn-pool-size threads runs the model with its own team of intra-op
+        threads, so up to nn-pool-size * num-threads threads can be busy at
+        the same time. If it is not given, one interop thread is used and
+        the number of intra-op threads is 1, or the number of CPUs of each
+        worker divided by --nn-pool-size if --num-workers > 1.
+        """,
     )
 
     parser.add_argument(
@@ -367,6 +421,20 @@ def get_args():
         """,
     )
 
+    parser.add_argument(
+        "--quantize",
+        type=str,
+        default="none",
+        help="""Used only on CPU. If it is int8, linear layers of the encoder
+        are quantized dynamically to int8 before the model is loaded.
+        The quantized model is saved to a temporary directory, which is
+        removed once it is loaded.
+        Valid values are: none, int8.
+        Note: It requires --encoder-model, i.e., a model exported by
+        torch.jit.trace().
+        """,
+    )
+
     parser.add_argument(
         "--certificate",
         type=str,
@@ -387,6 +455,64 @@ def get_args():
     return parser.parse_args()
 
 
+def set_quantized_engine() -> None:
+    """Select the backend that runs int8 quantized operators."""
+    # onednn uses VNNI instructions for int8 dot products if the CPU has them
+    for engine in ("onednn", "fbgemm"):
+        if engine in torch.backends.quantized.supported_engines:
+            torch.backends.quantized.engine = engine
+            break
+    logging.info(f"Quantized engine: {torch.backends.quantized.engine}")
+
+
+def quantize_encoder(filename: str, quantized_filename: str) -> None:
+    """Quantize linear layers of a torchscript encoder dynamically to int8.
+
+    Args:
+      filename:
+        Path to the encoder model exported by torch.jit.trace().
+      quantized_filename:
+        Path to save the quantized model.
+    """
+    try:
+        from torch.ao.quantization import (
+            convert_dynamic_jit,
+            default_dynamic_qconfig,
+            prepare_dynamic_jit,
+        )
+    except ImportError:
+        # For torch < 1.10
+        from torch.quantization import (
+            convert_dynamic_jit,
+            default_dynamic_qconfig,
+            prepare_dynamic_jit,
+        )
+
+    set_quantized_engine()
+
+    encoder = torch.jit.load(filename, map_location="cpu")
+    encoder.eval()
+
+    # The quantized model is frozen. Keep the methods and attributes
+    # that are used by sherpa besides forward()
+    preserved_attrs = [
+        name
+        for name in (
+            "training",
+            "get_init_state",
+            "get_init_states",
+            "decode_chunk_size",
+        )
+        if hasattr(encoder, name)
+    ]
+
+    encoder = prepare_dynamic_jit(encoder, {"": default_dynamic_qconfig})
+    encoder = convert_dynamic_jit(encoder, preserved_attrs=preserved_attrs)
+
+    torch.jit.save(encoder, quantized_filename)
+    logging.info(f"Saved int8 encoder to {quantized_filename}")
+
+
 def create_recognizer(args) -> sherpa.OnlineRecognizer:
     feat_config = sherpa.FeatureConfig()
 
@@ -433,8 +559,182 @@ def create_recognizer(args) -> sherpa.OnlineRecognizer:
     return recognizer
 
 
+def decode_dummy_batch(
+    recognizer: sherpa.OnlineRecognizer,
+    batch_size: int,
+) -> None:
+    """Decode a batch of streams containing 2 seconds of silence.
+
+    It is used to warm up the model before accepting requests.
+
+    Args:
+      recognizer:
+        An instance of online recognizer.
+      batch_size:
+        Number of streams in the batch.
+    """
+    sample_rate = int(
+        recognizer.config.feat_config.fbank_opts.frame_opts.samp_freq
+    )
+    samples = torch.zeros(2 * sample_rate, dtype=torch.float32)
+
+    streams = [recognizer.create_stream() for _ in range(batch_size)]
+    for s in streams:
+        s.accept_waveform(sampling_rate=sample_rate, waveform=samples)
+
+    decode_streams(recognizer, streams)
+
+
+def decode_streams(
+    recognizer: sherpa.OnlineRecognizer,
+    streams: List[sherpa.OnlineStream],
+) -> None:
+    """Decode a batch of streams with inference mode enabled.
+
+    Inference mode is thread-local, so it is enabled here, in the thread
+    that runs the model, instead of relying on the state of the caller.
+
+    Args:
+      recognizer:
+        An instance of online recognizer.
+      streams:
+        The streams to decode. All of them have to be ready.
+    """
+    with inference_mode():
+        recognizer.decode_streams(streams)
+
+
+def to_json(message: dict) -> str:
+    """Serialize a message that is sent to the client.
+
+    It uses orjson if it is installed and falls back to json otherwise.
+    """
+    if orjson is not None:
+        return orjson.dumps(message).decode("utf-8")
+    return json.dumps(message)
+
+
+class TimestampCache(dict):
+    """Map a timestamp in seconds to its string representation.
+
+    Timestamps are multiples of the output frame shift of the model, so
+    there are only a few distinct values and most of them are seen many
+    times, e.g., each partial result repeats the timestamps of the previous
+    one. Looking them up is several times faster than formatting them.
+    """
+
+    # The cache is cleared when it grows beyond this number of entries,
+    # i.e., about one hour of audio with an output frame shift of 40 ms.
+    max_size = 100000
+
+    def __missing__(self, t: float) -> str:
+        if len(self) >= self.max_size:
+            self.clear()
+        s = self[t] = "{:.3f}".format(t)
+        return s
+
+
+timestamp_cache = TimestampCache()
+
+
 def format_timestamps(timestamps: List[float]) -> List[str]:
-    return ["{:.3f}".format(t) for t in timestamps]
+    return list(map(timestamp_cache.__getitem__, timestamps))
+
+
+class RecvBuffer(object):
+    """Reusable storage for the audio samples received on one connection.
+
+    Samples of consecutive messages are appended to one of its two slots
+    until they are flushed to the stream. After that, the other slot is
+    used, so the feature extractor can still refer to the flushed samples
+    while new ones are being written.
+
+    A slot grows when a message does not fit into it.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Args:
+          capacity:
+            Initial number of samples a slot can hold.
+        """
+        self.samples = [
+            torch.empty(capacity, dtype=torch.float32) for _ in range(2)
+        ]
+
+        # Byte views of the two slots
+        self.slots = [s.numpy().view(np.uint8) for s in self.samples]
+        self.slot = 0
+
+        # Number of samples written to the current slot
+        self.num_samples = 0
+
+    def write(self, message: bytes) -> None:
+        """Append the samples of a message to the current slot.
+
+        Args:
+          message:
+            A bytes buffer containing audio samples in float32.
+            Its size has to be a multiple of 4.
+        """
+        if len(message) % 4 != 0:
+            raise ValueError(
+                f"Size of an audio message ({len(message)} bytes) "
+                "is not a multiple of 4"
+            )
+
+        start = self.num_samples * 4
+        end = start + len(message)
+        if end > self.slots[self.slot].size:
+            self.grow(end)
+
+        self.slots[self.slot][start:end] = np.frombuffer(
+            message, dtype=np.uint8
+        )
+        self.num_samples += len(message) // 4
+
+    def grow(self, num_bytes: int) -> None:
+        """Enlarge the current slot to hold at least num_bytes bytes.
+        The samples written to it are kept.
+
+        Args:
+          num_bytes:
+            The required size in bytes of the current slot.
+        """
+        old = self.samples[self.slot]
+        capacity = max(2 * old.numel(), (num_bytes + 3) // 4)
+
+        new = torch.empty(capacity, dtype=torch.float32)
+        new[: self.num_samples] = old[: self.num_samples]
+
+        self.samples[self.slot] = new
+        self.slots[self.slot] = new.numpy().view(np.uint8)
+
+    def flush(self) -> torch.Tensor:
+        """Take the samples written so far and switch to the other slot.
+
+        Returns:
+          Return a 1-D torch.float32 tensor viewing the written samples.
+          Its memory is reused after the next flush.
+        """
+        samples = self.samples[self.slot][: self.num_samples]
+        self.slot = 1 - self.slot
+        self.num_samples = 0
+        return samples
+
+
+class ServerProtocol(websockets.WebSocketServerProtocol):
+    """It disables Nagle's algorithm and enables TCP keepalive on accepted
+    connections, so that the small result messages are sent immediately.
+    """
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        super().connection_made(transport)
+
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
 
 
 class StreamingServer(object):
@@ -449,6 +749,7 @@ class StreamingServer(object):
         max_active_connections: int,
         doc_root: str,
         certificate: Optional[str] = None,
+        target_batch_fullness: float = 1.0,
     ):
         """
         Args:
@@ -456,7 +757,8 @@ class StreamingServer(object):
             An instance of online recognizer.
           nn_pool_size:
             Number of threads for the thread pool that is responsible for
-            neural network computation and decoding.
+            neural network computation and decoding. Up to this number of
+            batches are decoded concurrently.
           max_wait_ms:
             Max wait time in milliseconds in order to build a batch of
             `batch_size`.
@@ -480,6 +782,10 @@ class StreamingServer(object):
             Optional. If not None, it will use secure websocket.
             You can use ./sherpa/bin/web/generate-certificate.py to generate
             it (the default generated filename is `cert.pem`).
+          target_batch_fullness:
+            Optional. The wait time for building a batch decreases linearly
+            from max_wait_ms to 0 as the moving average of
+            batch_size/max_batch_size increases from 0 to this value.
         """
         self.recognizer = recognizer
 
@@ -490,60 +796,232 @@ class StreamingServer(object):
             max_workers=nn_pool_size,
             thread_name_prefix="nn",
         )
+        self.nn_pool_size = nn_pool_size
+
+        # Streams waiting to be decoded, each with a future that is resolved
+        # once the stream is decoded
+        self.pending_streams: Deque[
+            Tuple[sherpa.OnlineStream, asyncio.Future]
+        ] = collections.deque()
+
+        # They are created in run() so that they are bound to the running
+        # event loop.
+        #
+        # stream_available is set whenever a stream is added to
+        # self.pending_streams
+        self.stream_available: Optional[asyncio.Event] = None
+        self.nn_semaphore: Optional[asyncio.Semaphore] = None
+
+        # Tasks that are decoding a batch in self.nn_pool
+        self.decode_tasks = set()
 
-        self.stream_queue = asyncio.Queue()
         self.max_wait_ms = max_wait_ms
         self.max_batch_size = max_batch_size
+        self.target_batch_fullness = target_batch_fullness
+
+        # Exponential moving average of batch_size/max_batch_size
+        self.avg_batch_fullness = 0.0
         self.max_message_size = max_message_size
         self.max_queue_size = max_queue_size
         self.max_active_connections = max_active_connections
 
         self.current_active_connections = 0
 
+        # Receive buffers of the active connections, keyed by socket
+        self.recv_buffers: Dict[
+            websockets.WebSocketServerProtocol, RecvBuffer
+        ] = {}
+
         self.sample_rate = int(
             recognizer.config.feat_config.fbank_opts.frame_opts.samp_freq
         )
         self.decoding_method = recognizer.config.decoding_method
 
+        # Each decoding step of a stream consumes chunk_shift feature frames
+        # and needs chunk_size frames beyond the processed ones
+        self.chunk_shift = recognizer.chunk_shift
+        self.chunk_size = recognizer.chunk_size
+
+        # Frame length and frame shift in samples
+        frame_opts = recognizer.config.feat_config.fbank_opts.frame_opts
+        self.frame_length = int(
+            self.sample_rate * 0.001 * frame_opts.frame_length_ms
+        )
+        self.frame_shift = int(
+            self.sample_rate * 0.001 * frame_opts.frame_shift_ms
+        )
+        self.snip_edges = frame_opts.snip_edges
+
+        # 0.3 seconds of silence appended to each stream to flush the encoder.
+        # It is shared by all connections and never written to.
+        self.tail_padding = torch.zeros(
+            int(self.sample_rate * 0.3), dtype=torch.float32
+        )
+
+    def num_samples_for_frames(self, num_frames: int) -> int:
+        """Return the number of samples a stream needs to have at least
+        num_frames feature frames ready.
+
+        Args:
+          num_frames:
+            A positive number of feature frames.
+        """
+        if self.snip_edges:
+            return self.frame_length + (num_frames - 1) * self.frame_shift
+
+        # Otherwise, frame i is centered at i * frame_shift + frame_shift / 2
+        # and is computed once all of its samples are available
+        last_frame_end = (
+            (num_frames - 1) * self.frame_shift
+            + self.frame_shift // 2
+            - self.frame_length // 2
+            + self.frame_length
+        )
+        return max(
+            last_frame_end,
+            num_frames * self.frame_shift - self.frame_shift // 2,
+        )
+
+    async def warmup(self) -> None:
+        """Decode dummy batches of size 1, max_batch_size/2 and
+        max_batch_size on each thread of the NN pool to decrease the waiting
+        time of the first requests.
+
+        Besides running the model, it starts all threads of the pool and lets
+        each of them pay its one-time initialization cost, e.g., creating
+        cuBLAS handles.
+        """
+        logging.info("Warmup start")
+
+        batch_sizes = sorted(
+            {1, max(1, self.max_batch_size // 2), self.max_batch_size}
+        )
+
+        # Each job blocks until all of them are running, so that they end up
+        # on different threads of the pool
+        barrier = threading.Barrier(self.nn_pool_size)
+
+        def warmup_thread():
+            barrier.wait()
+            for batch_size in batch_sizes:
+                start_time = time.time()
+                decode_dummy_batch(self.recognizer, batch_size)
+                elapsed = time.time() - start_time
+                logging.info(
+                    f"Warmup with batch size {batch_size} on "
+                    f"{threading.current_thread().name} took {elapsed:.3f} s"
+                )
+
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *[
+                loop.run_in_executor(self.nn_pool, warmup_thread)
+                for _ in range(self.nn_pool_size)
+            ]
+        )
+
+        logging.info("Warmup done")
+
     async def stream_consumer_task(self):
         """This function extracts streams from the queue, batches them up, sends
         them to the RNN-T model for computation and decoding.
+
+        It does not wait for a batch to be decoded before building the next
+        one, so up to nn_pool_size batches are decoded concurrently.
         """
+        loop = asyncio.get_running_loop()
         while True:
-            if self.stream_queue.empty():
-                await asyncio.sleep(self.max_wait_ms / 1000)
-                continue
+            # Wait for a free thread in the NN pool. Streams keep
+            # accumulating in the meantime, which results in
+            # larger batches when the server is busy.
+            await self.nn_semaphore.acquire()
+
+            # Block until at least one stream is available
+            while not self.pending_streams:
+                self.stream_available.clear()
+                await self.stream_available.wait()
+
+            # Then wait for more streams to fill the batch.
+            # The busier the server, the shorter we wait.
+            wait_ms = self.max_wait_ms * max(
+                0.0, 1 - self.avg_batch_fullness / self.target_batch_fullness
+            )
+            if wait_ms > 0 and len(self.pending_streams) < self.max_batch_size:
+                # A single timer per batch wakes us up at the deadline
+                timed_out = False
+
+                def on_timeout():
+                    nonlocal timed_out
+                    timed_out = True
+                    self.stream_available.set()
+
+                timer = loop.call_later(wait_ms / 1000, on_timeout)
+                while (
+                    len(self.pending_streams) < self.max_batch_size
+                    and not timed_out
+                ):
+                    self.stream_available.clear()
+                    await self.stream_available.wait()
+                timer.cancel()
+
+            batch_size = min(len(self.pending_streams), self.max_batch_size)
+            batch = [self.pending_streams.popleft() for _ in range(batch_size)]
+
+            for item in batch:
+                assert self.recognizer.is_ready(item[0])
+
+            self.avg_batch_fullness += 0.1 * (
+                len(batch) / self.max_batch_size - self.avg_batch_fullness
+            )
 
-            batch = []
-            try:
-                while len(batch) < self.max_batch_size:
-                    item = self.stream_queue.get_nowait()
+            task = asyncio.create_task(self.decode_batch(batch))
+            self.decode_tasks.add(task)
+            task.add_done_callback(self.decode_tasks.discard)
 
-                    assert self.recognizer.is_ready(item[0])
+    async def decode_batch(
+        self,
+        batch: List[Tuple[sherpa.OnlineStream, asyncio.Future]],
+    ) -> None:
+        """Decode a batch of streams in the NN pool and notify the waiting
+        connections.
 
-                    batch.append(item)
-            except asyncio.QueueEmpty:
-                pass
-            stream_list = [b[0] for b in batch]
-            future_list = [b[1] for b in batch]
+        Args:
+          batch:
+            A list of (stream, future) pairs. The future is resolved after
+            the stream is decoded. If decoding fails, the exception is set
+            on the futures of all streams in the batch.
+        """
+        stream_list = [b[0] for b in batch]
+        future_list = [b[1] for b in batch]
 
-            loop = asyncio.get_running_loop()
+        loop = asyncio.get_running_loop()
+        try:
             await loop.run_in_executor(
                 self.nn_pool,
-                self.recognizer.decode_streams,
+                decode_streams,
+                self.recognizer,
                 stream_list,
             )
-
+        except Exception as e:
+            logging.exception(f"Failed to decode a batch of {len(batch)}")
             for f in future_list:
-                self.stream_queue.task_done()
+                if not f.done():
+                    f.set_exception(e)
+            return
+        finally:
+            self.nn_semaphore.release()
+
+        for f in future_list:
+            # It is cancelled if its connection is gone
+            if not f.done():
                 f.set_result(None)
 
     async def compute_and_decode(
         self,
         stream: sherpa.OnlineStream,
     ) -> None:
-        """Put the stream into the queue and wait it to be processed by the
-        consumer task.
+        """Add the stream to the pending streams and wait it to be processed
+        by the consumer task.
 
         Args:
           stream:
@@ -551,7 +1029,8 @@ class StreamingServer(object):
         """
         loop = asyncio.get_running_loop()
         future = loop.create_future()
-        await self.stream_queue.put((stream, future))
+        self.pending_streams.append((stream, future))
+        self.stream_available.set()
         await future
 
     async def process_request(
@@ -585,8 +1064,11 @@ class StreamingServer(object):
 
         return status, header, response
 
-    async def run(self, port: int):
+    async def run(self, port: int, reuse_port: bool = False):
+        self.stream_available = asyncio.Event()
+        self.nn_semaphore = asyncio.Semaphore(self.nn_pool_size)
         task = asyncio.create_task(self.stream_consumer_task())
+        await self.warmup()
 
         if self.certificate:
             logging.info(f"Using certificate: {self.certificate}")
@@ -604,6 +1086,10 @@ class StreamingServer(object):
             max_queue=self.max_queue_size,
             process_request=self.process_request,
             ssl=ssl_context,
+            create_protocol=ServerProtocol,
+            reuse_port=reuse_port,
+            ping_interval=20,
+            ping_timeout=20,
         ):
             ip_list = ["0.0.0.0", "localhost", "127.0.0.1"]
             ip_list.append(socket.gethostbyname(socket.gethostname()))
@@ -628,11 +1114,16 @@ class StreamingServer(object):
           socket:
             The socket for communicating with the client.
         """
+        self.recv_buffers[socket] = RecvBuffer(
+            self.num_samples_for_frames(self.chunk_size)
+        )
         try:
             await self.handle_connection_impl(socket)
         except websockets.exceptions.ConnectionClosedError:
             logging.info(f"{socket.remote_address} disconnected")
         finally:
+            del self.recv_buffers[socket]
+
             # Decrement so that it can accept new connections
             self.current_active_connections -= 1
 
@@ -659,10 +1150,26 @@ class StreamingServer(object):
 
         stream = self.recognizer.create_stream()
 
-        while True:
-            samples = await self.recv_audio_samples(socket)
-            if samples is None:
-                break
+        # (segment, text, number of tokens) of the last sent result
+        last_sent = None
+
+        # Number of samples passed to the stream and number of decoding
+        # steps run on it so far
+        num_accepted_samples = 0
+        num_steps = 0
+
+        recv_buffer = self.recv_buffers[socket]
+        while await self.recv_audio_samples(socket):
+            # Hold the samples back until they make the stream ready for
+            # its next decoding step. Passing them earlier changes nothing.
+            num_needed = self.num_samples_for_frames(
+                num_steps * self.chunk_shift + self.chunk_size
+            )
+            if num_accepted_samples + recv_buffer.num_samples < num_needed:
+                continue
+
+            samples = recv_buffer.flush()
+            num_accepted_samples += samples.numel()
 
             # TODO(fangjun): At present, we assume the sampling rate
             # of the received audio samples equal to --sample-rate
@@ -672,8 +1179,16 @@ class StreamingServer(object):
 
             while self.recognizer.is_ready(stream):
                 await self.compute_and_decode(stream)
+                num_steps += 1
                 result = self.recognizer.get_result(stream)
 
+                # Most chunks do not produce new tokens. Skip sending the
+                # same partial result again.
+                current = (result.segment, result.text, len(result.tokens))
+                if current == last_sent and not result.is_final:
+                    continue
+                last_sent = current
+
                 message = {
                     "method": self.decoding_method,
                     "segment": result.segment,
@@ -682,15 +1197,18 @@ class StreamingServer(object):
                     "timestamps": format_timestamps(result.timestamps),
                     "final": result.is_final,
                 }
-                print(message)
+                logging.debug(message)
 
-                await socket.send(json.dumps(message))
+                await socket.send(to_json(message))
+
+        # Samples received after the last full chunk
+        if recv_buffer.num_samples > 0:
+            stream.accept_waveform(
+                sampling_rate=self.sample_rate, waveform=recv_buffer.flush()
+            )
 
-        tail_padding = torch.rand(
-            int(self.sample_rate * 0.3), dtype=torch.float32
-        )
         stream.accept_waveform(
-            sampling_rate=self.sample_rate, waveform=tail_padding
+            sampling_rate=self.sample_rate, waveform=self.tail_padding
         )
         stream.input_finished()
         while self.recognizer.is_ready(stream):
@@ -707,13 +1225,14 @@ class StreamingServer(object):
             "final": True,  # end of connection, always set final to True
         }
 
-        await socket.send(json.dumps(message))
+        await socket.send(to_json(message))
 
     async def recv_audio_samples(
         self,
         socket: websockets.WebSocketServerProtocol,
-    ) -> Optional[torch.Tensor]:
-        """Receives a tensor from the client.
+    ) -> bool:
+        """Receives audio samples from the client and appends them to the
+        receive buffer of this connection.
 
         Each message contains either a bytes buffer containing audio samples
         in 16 kHz or contains "Done" meaning the end of utterance.
@@ -722,23 +1241,15 @@ class StreamingServer(object):
           socket:
             The socket for communicating with the client.
         Returns:
-          Return a 1-D torch.float32 tensor containing the audio samples or
-          return None.
+          Return False if the client sent "Done"; return True otherwise.
         """
         message = await socket.recv()
         if message == "Done":
-            return None
+            return False
 
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            # PyTorch warns that the underlying buffer is not writable.
-            # We ignore it here as we are not going to write it anyway.
-            if hasattr(torch, "frombuffer"):
-                # Note: torch.frombuffer is available only in torch>= 1.10
-                return torch.frombuffer(message, dtype=torch.float32)
-            else:
-                array = np.frombuffer(message, dtype=np.float32)
-                return torch.from_numpy(array)
+        self.recv_buffers[socket].write(message)
+
+        return True
 
 
 def check_args(args):
@@ -785,25 +1296,74 @@ def check_args(args):
     if args.decoding_method == "modified_beam_search":
         assert args.num_active_paths > 0, args.num_active_paths
 
+    if args.num_workers < 1:
+        raise ValueError(f"Invalid --num-workers {args.num_workers}")
+
+    if args.num_workers > 1 and not (
+        hasattr(socket, "SO_REUSEPORT") and hasattr(os, "sched_setaffinity")
+    ):
+        raise ValueError("--num-workers > 1 is supported only on Linux")
+
+    if not 0 < args.target_batch_fullness <= 1:
+        raise ValueError(
+            "--target-batch-fullness should be in (0, 1]. "
+            f"Given: {args.target_batch_fullness}"
+        )
+
+    if args.quantize not in ("none", "int8"):
+        raise ValueError(f"Unsupported quantization {args.quantize}")
+
+    if args.quantize == "int8":
+        if args.use_gpu:
+            raise ValueError("--quantize=int8 is supported only on CPU")
+
+        if args.nn_model:
+            raise ValueError("--quantize=int8 requires --encoder-model")
+
     if args.decoding_method == "fast_beam_search" and args.LG:
         if not Path(args.LG).is_file():
             raise ValueError(f"{args.LG} does not exist")
 
 
-@torch.no_grad()
-def main():
-    args = get_args()
-    logging.info(vars(args))
-    check_args(args)
+@inference_mode()
+def run_server(
+    args,
+    reuse_port: bool = False,
+    on_loaded: Optional[Callable[[], None]] = None,
+    default_num_threads: int = 1,
+):
+    """Create the recognizer and run the server until it is killed.
+
+    Args:
+      args:
+        The parsed command-line arguments.
+      reuse_port:
+        True to listen on the port with SO_REUSEPORT.
+      on_loaded:
+        Optional. If not None, it is called after the recognizer is created,
+        i.e., once the model files are no longer needed.
+      default_num_threads:
+        Number of intra-op threads if --num-threads is not given.
+    """
+    if args.num_threads is not None:
+        torch.set_num_threads(args.num_threads)
+        torch.set_num_interop_threads(args.num_threads)
+    else:
+        torch.set_num_threads(default_num_threads)
+        torch.set_num_interop_threads(1)
+
+    if args.quantize == "int8":
+        set_quantized_engine()
 
-    torch.set_num_threads(args.num_threads)
-    torch.set_num_interop_threads(args.num_threads)
     recognizer = create_recognizer(args)
+    if on_loaded is not None:
+        on_loaded()
 
     port = args.port
     nn_pool_size = args.nn_pool_size
     max_batch_size = args.max_batch_size
     max_wait_ms = args.max_wait_ms
+    target_batch_fullness = args.target_batch_fullness
     max_message_size = args.max_message_size
     max_queue_size = args.max_queue_size
     max_active_connections = args.max_active_connections
@@ -826,8 +1386,197 @@ def main():
         max_active_connections=max_active_connections,
         certificate=certificate,
         doc_root=doc_root,
+        target_batch_fullness=target_batch_fullness,
     )
-    asyncio.run(server.run(port))
+
+    try:
+        # Optional. It is a faster drop-in replacement of the default
+        # event loop.
+        import uvloop
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logging.info("Use uvloop")
+    except ImportError:
+        pass
+
+    asyncio.run(server.run(port, reuse_port=reuse_port))
+
+
+def parse_cpu_list(cpu_list: str) -> List[int]:
+    """Parse a CPU list in the format of the Linux sysfs, e.g., "0-3,8-11".
+
+    Args:
+      cpu_list:
+        The CPU list to parse.
+    Returns:
+      Return the CPU IDs in the list.
+    """
+    cpus = []
+    for r in cpu_list.strip().split(","):
+        if not r:
+            continue
+        first, _, last = r.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def get_numa_nodes() -> List[List[int]]:
+    """Return the CPUs of each NUMA node that this process may run on.
+
+    Nodes without such CPUs are skipped. It returns an empty list if the
+    NUMA topology is not available.
+    """
+    allowed = os.sched_getaffinity(0)
+    node_dirs = sorted(
+        Path("/sys/devices/system/node").glob("node[0-9]*"),
+        key=lambda d: int(d.name[4:]),  # e.g., node0
+    )
+
+    nodes = []
+    for d in node_dirs:
+        try:
+            cpu_list = (d / "cpulist").read_text()
+        except OSError:
+            continue
+        cpus = [c for c in parse_cpu_list(cpu_list) if c in allowed]
+        if cpus:
+            nodes.append(cpus)
+    return nodes
+
+
+def split_evenly(cpus: List[int], num_parts: int, index: int) -> List[int]:
+    """Split CPUs into num_parts parts whose sizes differ by at most one
+    and return the part with the given index.
+    """
+    begin = index * len(cpus) // num_parts
+    end = (index + 1) * len(cpus) // num_parts
+    return cpus[begin:end]
+
+
+def get_worker_cpus(num_workers: int, worker_id: int) -> List[int]:
+    """Return the CPUs that a worker is bound to.
+
+    Workers are assigned to NUMA nodes in turn. Workers on the same node
+    share its CPUs evenly, while a worker gets several whole nodes if there
+    are more nodes than workers. Without NUMA information, all CPUs of
+    this process are treated as one node.
+
+    Args:
+      num_workers:
+        Number of workers.
+      worker_id:
+        Index of the worker, in the range [0, num_workers).
+    """
+    nodes = get_numa_nodes() or [sorted(os.sched_getaffinity(0))]
+
+    if num_workers < len(nodes):
+        return [
+            c
+            for i, node in enumerate(nodes)
+            if i % num_workers == worker_id
+            for c in node
+        ]
+
+    node = nodes[worker_id % len(nodes)]
+    num_workers_on_node = len(
+        range(worker_id % len(nodes), num_workers, len(nodes))
+    )
+    cpus = split_evenly(node, num_workers_on_node, worker_id // len(nodes))
+
+    # There are more workers on the node than CPUs
+    return cpus or node
+
+
+def run_worker(args, worker_id: int, loaded):
+    """The entry point of a worker process when --num-workers > 1.
+
+    Args:
+      args:
+        The parsed command-line arguments.
+      worker_id:
+        Index of this worker, in the range [0, args.num_workers).
+      loaded:
+        Optional. If not None, it is released once the recognizer of this
+        worker is created.
+    """
+    # The model is loaded after binding, so its memory is allocated on the
+    # NUMA node of the worker
+    cpus = get_worker_cpus(args.num_workers, worker_id)
+    os.sched_setaffinity(0, cpus)
+    logging.info(f"Worker {worker_id} (pid {os.getpid()}) uses CPUs {cpus}")
+
+    # The threads of the NN pool run the model at the same time, so they
+    # share the CPUs of this worker
+    run_server(
+        args,
+        reuse_port=True,
+        on_loaded=loaded.release if loaded is not None else None,
+        default_num_threads=max(1, len(cpus) // args.nn_pool_size),
+    )
+
+
+def main():
+    args = get_args()
+    logging.info(vars(args))
+    check_args(args)
+
+    # We fork before torch creates any threads or initializes CUDA
+    ctx = multiprocessing.get_context("fork")
+
+    # The quantized encoder is saved in a temporary directory, which is
+    # removed once all recognizers have loaded it
+    tmp_dir = None
+    if args.quantize == "int8":
+        tmp_dir = tempfile.TemporaryDirectory()
+
+    try:
+        if tmp_dir is not None:
+            # Quantize once for all workers. It also runs in a child
+            # process so that torch is not initialized here.
+            encoder_model = str(Path(tmp_dir.name) / "encoder-int8.pt")
+            p = ctx.Process(
+                target=quantize_encoder,
+                args=(args.encoder_model, encoder_model),
+            )
+            p.start()
+            p.join()
+            if p.exitcode != 0:
+                sys.exit("Failed to quantize the encoder")
+            args.encoder_model = encoder_model
+
+        if args.num_workers == 1:
+            run_server(
+                args,
+                on_loaded=tmp_dir.cleanup if tmp_dir is not None else None,
+            )
+            return
+
+        loaded = ctx.Semaphore(0) if tmp_dir is not None else None
+        workers = [
+            ctx.Process(
+                target=run_worker, args=(args, i, loaded), name=f"worker-{i}"
+            )
+            for i in range(args.num_workers)
+        ]
+        for w in workers:
+            w.start()
+
+        if loaded is not None:
+            num_loaded = 0
+            while num_loaded < len(workers):
+                if loaded.acquire(timeout=1):
+                    num_loaded += 1
+                elif any(w.exitcode is not None for w in workers):
+                    # A worker failed to start
+                    break
+            else:
+                tmp_dir.cleanup()
+
+        for w in workers:
+            w.join()
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
 
 
 # See https://github.com/pytorch/pytorch/issues/38342
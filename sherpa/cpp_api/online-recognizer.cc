@@ -330,7 +330,24 @@ class OnlineRecognizer::OnlineRecognizerImpl {
     int32_t chunk_size = model_->ChunkSize();
     int32_t chunk_shift = model_->ChunkShift();
 
-    std::vector<torch::Tensor> all_features(n);
+    // Use the actual frame width since it may differ from the number of
+    // mel bins, e.g., with use_energy
+    torch::Tensor first_frame = ss[0]->GetFrame(ss[0]->GetNumProcessedFrames());
+    int32_t feature_dim = first_frame.size(1);
+
+    // The features of each stream are concatenated directly into its row of
+    // batched_features, so they are copied only once.
+    //
+    // For GPU, batched_features is allocated in page-locked memory so that
+    // the host-to-device copy below is asynchronous and overlaps with
+    // stacking the encoder states
+    auto batched_features =
+        torch::empty({n, chunk_size, feature_dim},
+                     torch::TensorOptions()
+                         .dtype(first_frame.dtype())
+                         .pinned_memory(device.is_cuda()));
+
+    std::vector<torch::Tensor> features_vec(chunk_size);
     std::vector<torch::IValue> all_states(n);
     std::vector<int32_t> all_processed_frames(n);
     std::vector<OnlineTransducerDecoderResult> all_results(n);
@@ -340,24 +357,23 @@ class OnlineRecognizer::OnlineRecognizerImpl {
       SHERPA_CHECK(IsReady(s));
       int32_t num_processed_frames = s->GetNumProcessedFrames();
 
-      std::vector<torch::Tensor> features_vec(chunk_size);
       for (int32_t k = 0; k != chunk_size; ++k) {
         features_vec[k] = s->GetFrame(num_processed_frames + k);
       }
 
-      torch::Tensor features = torch::cat(features_vec, /*dim*/ 0);
+      auto features = batched_features[i];
+      torch::cat_out(features, features_vec, /*dim*/ 0);
 
-      all_features[i] = std::move(features);
       all_states[i] = s->GetState();
       all_processed_frames[i] = num_processed_frames;
       all_results[i] = s->GetResult();
     }  // for (int32_t i = 0; i != n; ++i) {
 
-    auto batched_features = torch::stack(all_features, /*dim*/ 0);
-    batched_features = batched_features.to(device);
+    batched_features = batched_features.to(device, /*non_blocking*/ true);
 
     torch::Tensor features_length =
-        torch::full({n}, chunk_size, torch::kLong).to(device);
+        torch::full({n}, chunk_size,
+                    torch::TensorOptions().dtype(torch::kLong).device(device));
 
     torch::IValue stacked_states = model_->StackStates(all_states);
     torch::Tensor processed_frames =
@@ -419,6 +435,10 @@ class OnlineRecognizer::OnlineRecognizerImpl {
 
   const OnlineRecognizerConfig &GetConfig() const { return config_; }
 
+  int32_t ChunkShift() const { return model_->ChunkShift(); }
+
+  int32_t ChunkSize() const { return model_->ChunkSize(); }
+
  private:
   void WarmUp() {
     SHERPA_LOG(INFO) << "WarmUp begins";
@@ -484,4 +504,8 @@ const OnlineRecognizerConfig &OnlineRecognizer::GetConfig() const {
   return impl_->GetConfig();
 }
 
+int32_t OnlineRecognizer::ChunkShift() const { return impl_->ChunkShift(); }
+
+int32_t OnlineRecognizer::ChunkSize() const { return impl_->ChunkSize(); }
+
 }  // namespace sherpa
@@ -86,6 +86,17 @@ class OnlineRecognizer {
 
   const OnlineRecognizerConfig &GetConfig() const;
 
+  /** Return the number of feature frames of a stream that are consumed
+   * by each decoding step, i.e., by each call of DecodeStreams().
+   */
+  int32_t ChunkShift() const;
+
+  /** Return the number of feature frames a stream needs beyond the
+   * processed ones before it is ready for the next decoding step.
+   * It is ChunkShift() plus the right context of the model.
+   */
+  int32_t ChunkSize() const;
+
   // Create a stream for decoding.
   std::unique_ptr<OnlineStream> CreateStream();
 
@@ -58,12 +58,19 @@ void OnlineTransducerGreedySearchDecoder::Decode(
   int32_t N = encoder_out.size(0);
   int32_t T = encoder_out.size(1);
 
+  // For GPU, decoder_input is allocated in page-locked memory so that it can
+  // be copied to the device asynchronously. It is safe to overwrite it
+  // on the next emission since argmax().cpu() below waits for all
+  // pending work on the device, including the copy.
   auto decoder_input = torch::empty(
       {N, context_size}, torch::dtype(torch::kLong)
-                             .memory_format(torch::MemoryFormat::Contiguous));
+                             .memory_format(torch::MemoryFormat::Contiguous)
+                             .pinned_memory(device.is_cuda()));
   BuildDecoderInput(*results, &decoder_input);
 
-  auto decoder_out = model_->RunDecoder(decoder_input.to(device)).squeeze(1);
+  auto decoder_out =
+      model_->RunDecoder(decoder_input.to(device, /*non_blocking*/ true))
+          .squeeze(1);
   // decoder_out has shape (N, joiner_dim)
 
   for (int32_t t = 0; t != T; ++t) {
@@ -92,7 +99,9 @@ void OnlineTransducerGreedySearchDecoder::Decode(
 
     if (emitted) {
       BuildDecoderInput(*results, &decoder_input);
-      decoder_out = model_->RunDecoder(decoder_input.to(device)).squeeze(1);
+      decoder_out =
+          model_->RunDecoder(decoder_input.to(device, /*non_blocking*/ true))
+              .squeeze(1);
       // decoder_out has shape (N, joiner_dim)
     }
   }  // for (int32_t t = 0; t != T; ++t)
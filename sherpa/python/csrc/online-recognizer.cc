@@ -99,6 +99,10 @@ void PybindOnlineRecognizer(py::module &m) {  // NOLINT
       .def("get_result", &PyClass::GetResult, py::arg("s"),
            py::call_guard<py::gil_scoped_release>())
       .def_property_readonly("config", &PyClass::GetConfig,
+                             py::call_guard<py::gil_scoped_release>())
+      .def_property_readonly("chunk_shift", &PyClass::ChunkShift,
+                             py::call_guard<py::gil_scoped_release>())
+      .def_property_readonly("chunk_size", &PyClass::ChunkSize,
                              py::call_guard<py::gil_scoped_release>());
 }
 
@@ -913,6 +913,52 @@ class TestOnlineRecognizer(unittest.TestCase):
 
         decode(recognizer=recognizer, s=s, samples=samples)
 
+    def test_chunk_shift_and_chunk_size(self):
+        nn_model = f"{d}/icefall-asr-librispeech-pruned-transducer-stateless7-streaming-2022-12-29/exp/cpu_jit.pt"
+        tokens = f"{d}/icefall-asr-librispeech-pruned-transducer-stateless7-streaming-2022-12-29/data/lang_bpe_500/tokens.txt"
+
+        if not Path(nn_model).is_file():
+            print(f"{nn_model} does not exist")
+            print("skipping test_chunk_shift_and_chunk_size()")
+            return
+
+        feat_config = sherpa.FeatureConfig()
+        feat_config.fbank_opts.frame_opts.samp_freq = 16000
+        feat_config.fbank_opts.mel_opts.num_bins = 80
+        feat_config.fbank_opts.frame_opts.dither = 0
+
+        config = sherpa.OnlineRecognizerConfig(
+            nn_model=nn_model,
+            tokens=tokens,
+            use_gpu=False,
+            feat_config=feat_config,
+            decoding_method="greedy_search",
+            chunk_size=32,
+        )
+
+        recognizer = sherpa.OnlineRecognizer(config)
+        chunk_shift = recognizer.chunk_shift
+        chunk_size = recognizer.chunk_size
+        assert 0 < chunk_shift <= chunk_size, (chunk_shift, chunk_size)
+
+        # 25 ms frame length and 10 ms frame shift at 16 kHz
+        def num_samples(num_frames):
+            return 400 + (num_frames - 1) * 160
+
+        s = recognizer.create_stream()
+        n = num_samples(chunk_size)
+        s.accept_waveform(16000, torch.zeros(n - 1))
+        assert not recognizer.is_ready(s)
+        s.accept_waveform(16000, torch.zeros(1))
+        assert recognizer.is_ready(s)
+
+        # Each decoding step consumes chunk_shift frames
+        recognizer.decode_stream(s)
+        assert not recognizer.is_ready(s)
+        m = num_samples(chunk_shift + chunk_size)
+        s.accept_waveform(16000, torch.zeros(m - n))
+        assert recognizer.is_ready(s)
+
 
 torch.set_num_threads(1)
 torch.set_num_interop_threads(1)